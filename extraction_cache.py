@@ -0,0 +1,69 @@
+"""
+On-Disk Extraction Cache
+
+Stores extraction results keyed by a content hash so re-processing an
+unchanged PDF skips the OpenAI calls entirely.
+
+Entries live as individual JSON files under the cache directory, named
+by their key. Keys should already encode everything that affects the
+output (document bytes, model name, prompt version) so stale entries
+are simply never looked up again.
+"""
+
+import json
+import os
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / "cache"
+
+
+def _resolve_cache_dir(cache_dir: Path | None) -> Path:
+    """Explicit argument wins, then EXTRACTION_CACHE_DIR, then cache/."""
+    if cache_dir is not None:
+        return cache_dir
+    env_dir = os.environ.get("EXTRACTION_CACHE_DIR")
+    if env_dir:
+        return Path(env_dir)
+    return DEFAULT_CACHE_DIR
+
+
+def get(key: str, cache_dir: Path | None = None) -> dict | None:
+    """
+    Look up a cached extraction result.
+
+    Args:
+        key: Hex digest identifying the extraction
+        cache_dir: Directory holding cache entries (defaults to cache/)
+
+    Returns:
+        The cached result dict, or None on miss or unreadable entry
+    """
+    cache_dir = _resolve_cache_dir(cache_dir)
+    cache_file = cache_dir / f"{key}.json"
+
+    if not cache_file.exists():
+        return None
+
+    try:
+        with open(cache_file, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        # A corrupt entry behaves like a miss; it gets overwritten on put
+        return None
+
+
+def put(key: str, data: dict, cache_dir: Path | None = None) -> None:
+    """
+    Store an extraction result in the cache.
+
+    Args:
+        key: Hex digest identifying the extraction
+        data: JSON-serializable result to store
+        cache_dir: Directory holding cache entries (defaults to cache/)
+    """
+    cache_dir = _resolve_cache_dir(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    cache_file = cache_dir / f"{key}.json"
+    with open(cache_file, "w") as f:
+        json.dump(data, f)
@@ -9,116 +9,220 @@ OpenAI's vision capabilities.
 """
 
 import os
+import re
 import sys
+import copy
 import json
+import time
+import atexit
 import base64
+import asyncio
+import hashlib
+import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import fitz  # PyMuPDF
+import httpx
+import numpy as np
 import yaml
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
+from pydantic import BaseModel, ValidationError
 
+try:
+    # aiohttp transport (openai[aiohttp]) sustains high fan-out better
+    # than the default httpx AsyncClient
+    from openai import DefaultAioHttpClient
+except ImportError:
+    DefaultAioHttpClient = None
 
-def load_config() -> dict:
-    """Load configuration from YAML file."""
-    config_path = Path(__file__).parent / "config" / "model_config.yaml"
-    with open(config_path, "r") as f:
-        return yaml.safe_load(f)
+try:
+    import orjson
+except ImportError:  # optional; stdlib json is the fallback
+    orjson = None
 
+try:
+    import pybase64  # optional; SIMD-accelerated drop-in for base64
+except ImportError:
+    pybase64 = None
 
-def load_api_key() -> str:
-    """Load OpenAI API key from .env file."""
-    env_path = Path(__file__).parent / ".env"
-    
-    # Read the .env file manually since it has non-standard format
-    with open(env_path, "r") as f:
-        content = f.read()
-    
-    # Parse the key (format: "OpenAi key : <key>")
-    if ":" in content:
-        api_key = content.split(":", 1)[1].strip()
-        return api_key
-    
-    raise ValueError("Could not find API key in .env file")
+import extraction_cache
 
+# Populate OPENAI_API_KEY from .env once at import; the SDK discovers
+# it from the environment, so no key plumbing is needed
+load_dotenv(Path(__file__).parent / ".env")
 
-def extract_text_from_pdf(pdf_path: str) -> list[dict]:
+# Bump whenever the extraction prompts change so cached results from
+# older prompts are no longer served
+PROMPT_VERSION = "v3"
+
+# Strict schema enforced server-side: the decoder is constrained to
+# exactly these keys and types, so no post-hoc alias rescue is needed
+ITEMS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "invoice_items",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "line_number": {"type": "integer"},
+                            "description": {"type": "string"},
+                            "amount": {"type": "number"},
+                            "Quantity": {"type": ["number", "null"]},
+                            "Unit_price": {"type": ["number", "null"]}
+                        },
+                        "required": [
+                            "line_number",
+                            "description",
+                            "amount",
+                            "Quantity",
+                            "Unit_price"
+                        ],
+                        "additionalProperties": False
+                    }
+                }
+            },
+            "required": ["items"],
+            "additionalProperties": False
+        }
+    }
+}
+
+# Batched requests carry several pages, so the model stamps each item
+# with the page it came from; the schema gains a required "_page" field
+BATCH_ITEMS_RESPONSE_FORMAT = copy.deepcopy(ITEMS_RESPONSE_FORMAT)
+BATCH_ITEMS_RESPONSE_FORMAT["json_schema"]["name"] = "invoice_items_batched"
+_batch_item_schema = BATCH_ITEMS_RESPONSE_FORMAT["json_schema"]["schema"]["properties"]["items"]["items"]
+_batch_item_schema["properties"]["_page"] = {"type": "integer"}
+_batch_item_schema["required"].append("_page")
+del _batch_item_schema
+
+# Monetary amounts as they appear on invoices ($1,234.56, 1 234.56);
+# a text page with no match cannot yield line items, so it never
+# reaches the model
+_AMOUNT_RE = re.compile(r"\$?\d{1,3}(?:[,\s]\d{3})*\.\d{2}")
+
+# Short text pages share one request up to this combined size; every
+# request pays fixed prompt-token and latency overhead, so packing
+# pages cuts both. Pages at or over the budget go out alone.
+TEXT_BATCH_CHAR_BUDGET = 12000
+
+# Most invoices are legible at 150 DPI; pages that come back empty are
+# re-rendered individually at the high setting
+DEFAULT_RENDER_DPI = 150
+HIGH_RENDER_DPI = 300
+
+# Most pages fit comfortably in the small output budget; only calls
+# whose output was truncated retry with the large one
+VISION_MAX_TOKENS = 1024
+VISION_MAX_TOKENS_RETRY = 4096
+
+
+# One TLS handshake amortized across all in-flight calls; generous
+# keep-alive so warm connections survive between page batches. The
+# 30s ceiling keeps one hung connection from stalling a whole gather.
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+
+def _http_limits(concurrency: int) -> httpx.Limits:
+    """Connection pool limits sized for the page fan-out."""
+    return httpx.Limits(
+        max_connections=concurrency * 2,
+        max_keepalive_connections=concurrency * 2
+    )
+
+
+def _make_http_client(concurrency: int):
     """
-    Extract text from each page of a PDF document.
-    
-    Args:
-        pdf_path: Path to the PDF file
-        
-    Returns:
-        List of dicts with page number, extracted text, and whether it has text
+    Build the async HTTP transport for the OpenAI client.
+
+    Uses the SDK's aiohttp transport when the extra is installed —
+    httpx's pool serializes badly under heavy concurrency — otherwise
+    a tuned HTTP/2 httpx client.
     """
-    pages_data = []
-    
-    with fitz.open(pdf_path) as doc:
-        for page_num, page in enumerate(doc, start=1):
-            text = page.get_text().strip()
-            has_text = bool(text)
-            
-            pages_data.append({
-                "page_number": page_num,
-                "text": text,
-                "has_text": has_text
-            })
-    
-    return pages_data
+    if DefaultAioHttpClient is not None:
+        return DefaultAioHttpClient()
+    return httpx.AsyncClient(
+        http2=True,
+        limits=_http_limits(concurrency),
+        timeout=HTTP_TIMEOUT
+    )
+
+
+# One event loop and one AsyncOpenAI client per process: tearing the
+# client down between PDFs discards warm TLS connections and pays the
+# handshake again on the next document. The client is bound to its
+# loop, so the loop persists too.
+_event_loop: asyncio.AbstractEventLoop | None = None
+_async_client: AsyncOpenAI | None = None
 
 
-def convert_page_to_image(pdf_path: str, page_num: int, dpi: int = 200) -> str:
+def _get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop, creating it on first use."""
+    global _event_loop
+    if _event_loop is None:
+        _event_loop = asyncio.new_event_loop()
+    return _event_loop
+
+
+def _get_async_client(concurrency: int) -> AsyncOpenAI:
     """
-    Convert a PDF page to a base64-encoded image.
-    
-    Args:
-        pdf_path: Path to the PDF file
-        page_num: Page number (1-indexed)
-        dpi: Resolution for the image
-        
-    Returns:
-        Base64-encoded PNG image string
+    Return the shared AsyncOpenAI client, creating it on first use.
+
+    The key comes from OPENAI_API_KEY, loaded from .env at import. The
+    connection pool is sized from the first call's concurrency; later
+    calls reuse it as-is, which is the point — warm connections carry
+    over between documents.
     """
-    with fitz.open(pdf_path) as doc:
-        page = doc[page_num - 1]
-        
-        # Create a matrix for the resolution
-        zoom = dpi / 72  # 72 is the default DPI
-        matrix = fitz.Matrix(zoom, zoom)
-        
-        # Render the page as a pixmap
-        pixmap = page.get_pixmap(matrix=matrix)
-        
-        # Get PNG bytes and encode to base64
-        png_bytes = pixmap.tobytes("png")
-        base64_image = base64.b64encode(png_bytes).decode("utf-8")
-        
-        return base64_image
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncOpenAI(
+            http_client=_make_http_client(concurrency),
+            # Applied per request whichever transport is in use
+            timeout=30.0
+        )
+    return _async_client
 
 
-def extract_amounts_from_text(
-    client: OpenAI,
-    model_name: str,
-    page_text: str,
-    page_number: int,
-    pdf_name: str
-) -> list[dict]:
+@atexit.register
+def _shutdown_async_client() -> None:
+    """Close the shared client and its loop on interpreter exit."""
+    if _async_client is not None and _event_loop is not None and not _event_loop.is_closed():
+        _event_loop.run_until_complete(_async_client.close())
+    if _event_loop is not None and not _event_loop.is_closed():
+        _event_loop.close()
+
+
+def _vision_attempts() -> list[tuple[int, str]]:
     """
-    Use OpenAI to extract line item amounts from invoice text.
-    
-    Args:
-        client: OpenAI client instance
-        model_name: Name of the model to use
-        page_text: Extracted text from the PDF page
-        page_number: Page number in the PDF
-        pdf_name: Name of the PDF file
-        
-    Returns:
-        List of extracted line items with amounts
+    Build the (dpi, detail) ladder for vision calls.
+
+    Controlled by VISION_DETAIL_STRATEGY: "auto" (default) tries a
+    cheap low-detail pass and escalates empty pages to a high-detail
+    high-DPI retry; "low" and "high" pin the detail level.
     """
-    prompt = f"""You are an invoice data extraction assistant. Your task is to extract ALL line items with their amounts from the provided invoice text.
+    strategy = os.getenv("VISION_DETAIL_STRATEGY", "auto").lower()
+    base_dpi = _render_settings()["dpi"]
+    if strategy == "low":
+        return [(base_dpi, "low")]
+    if strategy == "high":
+        return [(base_dpi, "high"), (HIGH_RENDER_DPI, "high")]
+    return [(base_dpi, "low"), (HIGH_RENDER_DPI, "high")]
+
+# The static instruction blocks live in the system message and must be
+# byte-identical across calls so OpenAI's server-side prompt cache can
+# reuse the prefix; only the user message varies per page.
+TEXT_SYSTEM_PROMPT = """You are a precise data extraction assistant. You only extract data that exists in the provided text. Never generate or infer data.
+
+Your task is to extract ALL line items with their amounts from the provided invoice text.
 
 CRITICAL RULES:
 1. ONLY extract data that is explicitly present in the document
@@ -141,91 +245,17 @@ Return a JSON object with a key "items" containing an array of objects. Each obj
 - "Unit_price" (number)
 
 If Quantity or Unit_price is not visible in the document, use null for that field.
-If no line items with amounts are found, return: {{"items": []}}
+If no line items with amounts are found, return: {"items": []}
 
-Invoice text to extract from:
----
-{page_text}
----"""
+The user message contains the invoice text to extract from."""
 
-    try:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a precise data extraction assistant. You only extract data that exists in the provided text. Never generate or infer data."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0,
-            response_format={"type": "json_object"}
-        )
-        
-        response_text = response.choices[0].message.content.strip()
-        parsed = json.loads(response_text)
-        
-        # Extract items from response
-        items = parsed.get("items", [])
-        
-        # Add page and PDF metadata to each item
-        for item in items:
-            item["_page"] = page_number
-            item["_pdf"] = pdf_name
-            
-            # Ensure amount is a float
-            if "amount" in item:
-                try:
-                    item["amount"] = float(item["amount"])
-                except (ValueError, TypeError):
-                    item["amount"] = 0.0
-            
-            # Ensure Quantity is a float or None
-            if "Quantity" in item and item["Quantity"] is not None:
-                try:
-                    item["Quantity"] = float(item["Quantity"])
-                except (ValueError, TypeError):
-                    item["Quantity"] = None
-            
-            # Ensure Unit_price is a float or None
-            if "Unit_price" in item and item["Unit_price"] is not None:
-                try:
-                    item["Unit_price"] = float(item["Unit_price"])
-                except (ValueError, TypeError):
-                    item["Unit_price"] = None
-        
-        return items
-        
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON response: {e}", file=sys.stderr)
-        return []
-    except Exception as e:
-        print(f"Error during text extraction: {e}", file=sys.stderr)
-        return []
+TEXT_BATCH_SYSTEM_PROMPT = TEXT_SYSTEM_PROMPT + """
 
+The user message contains SEVERAL invoice pages, each introduced by a delimiter line of the form <<<PAGE n>>>. Extract line items from every page. Each item object must additionally include the key "_page" (integer): the page number from the delimiter the item appeared under."""
 
-def extract_amounts_from_image(
-    client: OpenAI,
-    base64_image: str,
-    page_number: int,
-    pdf_name: str
-) -> list[dict]:
-    """
-    Use OpenAI Vision to extract line item amounts from an invoice image.
-    
-    Args:
-        client: OpenAI client instance
-        base64_image: Base64-encoded image of the invoice page
-        page_number: Page number in the PDF
-        pdf_name: Name of the PDF file
-        
-    Returns:
-        List of extracted line items with amounts
-    """
-    prompt = """You are an invoice data extraction assistant. Your task is to extract ALL line items with their amounts from the provided invoice image.
+IMAGE_SYSTEM_PROMPT = """You are a precise data extraction assistant. You only extract data that is explicitly visible in the provided invoice image. Never generate or infer data.
+
+Your task is to extract ALL line items with their amounts from the provided invoice image.
 
 CRITICAL RULES:
 1. ONLY extract data that is explicitly visible in the invoice image
@@ -252,67 +282,643 @@ If no line items with amounts are found, return: {"items": []}
 
 IMPORTANT: Only extract what you can clearly see in the image. Do not guess or approximate."""
 
+
+@functools.lru_cache(maxsize=1)
+def load_config() -> dict:
+    """Load configuration from YAML file (parsed once per process)."""
+    config_path = Path(__file__).parent / "config" / "model_config.yaml"
+    with open(config_path, "r") as f:
+        return yaml.safe_load(f)
+
+
+@functools.lru_cache(maxsize=1)
+def _render_settings() -> dict:
+    """Page-render settings from config, with the built-in defaults."""
+    render = load_config().get("render", {})
+    return {
+        "dpi": int(render.get("dpi", DEFAULT_RENDER_DPI)),
+        "format": render.get("format", "jpeg"),
+        "jpeg_quality": int(render.get("jpeg_quality", 85)),
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _prefilter_enabled() -> bool:
+    """Whether the amount-regex prefilter is on (default yes)."""
+    return bool(load_config().get("prefilter_enabled", True))
+
+
+@functools.lru_cache(maxsize=1)
+def _budget_settings() -> dict:
+    """Output-token budget settings from config, with defaults."""
+    budget = load_config().get("budget", {})
+    return {
+        "tokens_per_item": int(budget.get("tokens_per_item", 60)),
+        "vision_max_tokens": int(budget.get("vision_max_tokens", VISION_MAX_TOKENS)),
+    }
+
+
+def _text_max_tokens(page_text: str) -> int:
+    """
+    Output budget sized to a text page's likely item count.
+
+    Invoices put roughly one line item per couple of text lines; a
+    budget near the real need lets the server route to faster decoding
+    slots and caps tail latency, and truncation still escalates to the
+    large retry budget.
+    """
+    lines_estimate = max(1, len(page_text.splitlines()) // 2)
+    # Each line item carries at least one amount, so the match count
+    # tightens the estimate when it's lower
+    matches = len(_AMOUNT_RE.findall(page_text))
+    expected_items = min(lines_estimate, matches) if matches else lines_estimate
+    per_item = _budget_settings()["tokens_per_item"]
+    return min(VISION_MAX_TOKENS_RETRY, max(256, per_item * expected_items))
+
+
+class _RateLimiter:
+    """
+    Token bucket over requests/min and tokens/min.
+
+    Capacity refills continuously with elapsed time; an acquire that
+    would overdraw sleeps until both buckets cover it. Smoothing bursts
+    client-side is much cheaper than tripping the server's 429 backoff,
+    which stalls a call for seconds at a time.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._request_capacity = float(rpm)
+        self._token_capacity = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._request_capacity = min(
+            float(self.rpm), self._request_capacity + self.rpm * elapsed / 60.0
+        )
+        self._token_capacity = min(
+            float(self.tpm), self._token_capacity + self.tpm * elapsed / 60.0
+        )
+
+    async def acquire(self, tokens: int) -> None:
+        """Block until one request and the estimated tokens fit."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._request_capacity >= 1.0 and self._token_capacity >= tokens:
+                    self._request_capacity -= 1.0
+                    self._token_capacity -= tokens
+                    return
+                request_wait = (1.0 - self._request_capacity) * 60.0 / self.rpm
+                token_wait = (tokens - self._token_capacity) * 60.0 / self.tpm
+                await asyncio.sleep(max(request_wait, token_wait, 0.01))
+
+
+@functools.lru_cache(maxsize=1)
+def _get_rate_limiter() -> _RateLimiter | None:
+    """Build the shared limiter from the limits config, if configured."""
+    limits = load_config().get("limits", {})
+    rpm = limits.get("rpm")
+    tpm = limits.get("tpm")
+    if not rpm or not tpm:
+        return None
+    return _RateLimiter(int(rpm), int(tpm))
+
+
+def _estimate_tokens(messages: list[dict], max_tokens: int | None) -> int:
+    """
+    Cheap upper-bound token estimate for a chat request.
+
+    Text is counted at four characters per token; an image attachment
+    is charged a flat high-detail allowance. The output budget is
+    included since it counts against the TPM limit too.
+    """
+    total = 0
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            total += len(content) // 4
+        else:
+            total += 1100  # high-detail image allowance
+    return total + (max_tokens or VISION_MAX_TOKENS_RETRY)
+
+
+def iter_pdf_pages(doc: fitz.Document):
+    """
+    Lazily yield text data for each page of an open PDF document.
+
+    Yielding one page at a time keeps only the pages currently being
+    processed resident instead of materializing the whole document.
+
+    Args:
+        doc: Open fitz document
+
+    Yields:
+        Dicts with page number, extracted text, and whether it has text
+    """
+    for page_num, page in enumerate(doc, start=1):
+        # flags=0 skips image and annotation extraction; only the plain
+        # text layer matters for the has-text decision and the prompt
+        text = page.get_text("text", flags=0, sort=False).strip()
+
+        # A couple of stray OCR characters shouldn't count as a text
+        # layer — that would burn an LLM call on an empty prompt while
+        # skipping the vision pass that could actually read the page
+        non_space = sum(1 for c in text if not c.isspace())
+        has_text = non_space > 20
+
+        yield {
+            "page_number": page_num,
+            "text": text,
+            "has_text": has_text
+        }
+
+
+def extract_text_from_pdf(pdf_path: str) -> list[dict]:
+    """
+    Extract text from each page of a PDF document.
+
+    Args:
+        pdf_path: Path to the PDF file
+
+    Returns:
+        List of dicts with page number, extracted text, and whether it has text
+    """
+    with fitz.open(pdf_path) as doc:
+        return list(iter_pdf_pages(doc))
+
+
+@functools.lru_cache(maxsize=None)
+def _render_matrix(dpi: int) -> fitz.Matrix:
+    """Shared zoom matrix for a DPI; only a handful of values occur."""
+    zoom = dpi / 72  # 72 is the default DPI
+    return fitz.Matrix(zoom, zoom)
+
+
+def convert_page_to_image(doc: fitz.Document, page_num: int, dpi: int | None = None) -> bytes:
+    """
+    Render a PDF page to compressed image bytes.
+
+    Pages are encoded as JPEG by default: for scanned documents it is
+    several times smaller than PNG, so less memory is held per page and
+    less data crosses the wire to the API. Format, quality, and default
+    DPI come from the render section of model_config.yaml. Base64
+    encoding for the data URI happens separately (see
+    _encode_image_async) so it can overlap other pages' uploads.
+
+    Args:
+        doc: Open fitz document
+        page_num: Page number (1-indexed)
+        dpi: Resolution for the image (defaults to the configured DPI)
+
+    Returns:
+        Compressed image bytes
+    """
+    settings = _render_settings()
+    if dpi is None:
+        dpi = settings["dpi"]
+    page = doc[page_num - 1]
+
+    # Render the page as a pixmap; invoices have no transparency, so
+    # dropping the alpha channel cuts pixel bytes by a quarter
+    pixmap = page.get_pixmap(matrix=_render_matrix(dpi), alpha=False)
+
+    if settings["format"] == "jpeg":
+        return pixmap.tobytes("jpeg", jpg_quality=settings["jpeg_quality"])
+    return pixmap.tobytes(settings["format"])
+
+
+_render_pool: ProcessPoolExecutor | None = None
+
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    """Return the shared render pool, creating it on first use.
+
+    Created lazily so text-only documents never pay the worker
+    startup cost.
+    """
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _render_pool
+
+
+@atexit.register
+def _shutdown_render_pool() -> None:
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False)
+
+
+def _render_page_bytes(pdf_path: str, page_num: int, dpi: int | None) -> bytes:
+    """
+    Render one page to image bytes in a worker process.
+
+    fitz documents aren't picklable, so the worker opens its own handle;
+    the re-parse of the xref is trivial next to a 150+ DPI render.
+
+    Args:
+        pdf_path: Path to the PDF file
+        page_num: Page number (1-indexed)
+        dpi: Resolution for the image (None uses the configured DPI)
+
+    Returns:
+        Compressed image bytes
+    """
+    with fitz.open(pdf_path) as doc:
+        return convert_page_to_image(doc, page_num, dpi=dpi)
+
+
+async def _render_page_async(pdf_path: str, page_num: int, dpi: int | None) -> bytes:
+    """
+    Render a page in the process pool without blocking the event loop.
+
+    Rendering is the CPU-heavy step for scanned documents; pushing it
+    to worker processes lets N pages rasterize on idle cores while the
+    loop awaits LLM responses for already-rendered pages.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_render_pool(), _render_page_bytes, pdf_path, page_num, dpi
+    )
+
+
+def _encode_image(img_bytes: bytes) -> str:
+    """Base64-encode image bytes; memoryview avoids an extra copy."""
+    encoder = pybase64 if pybase64 is not None else base64
+    return encoder.b64encode(memoryview(img_bytes)).decode("ascii")
+
+
+async def _encode_image_async(img_bytes: bytes) -> str:
+    """
+    Base64-encode on a worker thread.
+
+    The encode is pure CPU over a few hundred KB; running it off the
+    event loop lets other pages' HTTP uploads proceed meanwhile.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _encode_image, img_bytes)
+
+
+# Pages whose small thumbnail shows almost no pixel variance are blank
+# separators and never worth a vision call
+BLANK_PAGE_STD_THRESHOLD = 3.0
+BLANK_PAGE_THUMB_DPI = 50
+
+
+def is_blank_page(doc: fitz.Document, page_num: int) -> bool:
+    """
+    Cheaply detect a visually blank page from a small thumbnail.
+
+    Args:
+        doc: Open fitz document
+        page_num: Page number (1-indexed)
+
+    Returns:
+        True when the rendered thumbnail has almost no pixel variance
+    """
+    page = doc[page_num - 1]
+    thumb = page.get_pixmap(matrix=_render_matrix(BLANK_PAGE_THUMB_DPI), alpha=False)
+    samples = np.frombuffer(thumb.samples, dtype=np.uint8)
+    return float(samples.std()) < BLANK_PAGE_STD_THRESHOLD
+
+
+def _page_thumb_hash(doc: fitz.Document, page_num: int) -> str:
+    """
+    Content hash of a page's small thumbnail.
+
+    Hashing the downsampled render instead of the full pixmap is fast
+    and robust to the DPI chosen for the real extraction render.
+
+    Args:
+        doc: Open fitz document
+        page_num: Page number (1-indexed)
+
+    Returns:
+        Hex digest of the thumbnail pixels
+    """
+    page = doc[page_num - 1]
+    thumb = page.get_pixmap(matrix=_render_matrix(BLANK_PAGE_THUMB_DPI), alpha=False)
+    return hashlib.sha1(thumb.samples).hexdigest()
+
+
+def _json_loads(content: str):
+    """Parse JSON with orjson when available, stdlib json otherwise."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def save_json_output(data: dict, output_path) -> None:
+    """
+    Write a result dict to disk as indented JSON.
+
+    Args:
+        data: JSON-serializable result
+        output_path: Path of the file to write
+    """
+    if orjson is not None:
+        with open(output_path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_path, "w") as f:
+            json.dump(data, f, indent=2)
+
+
+# Strips currency symbols, grouping commas, and spaces in one pass
+_NUMERIC_CLEAN_TABLE = {ord(c): None for c in ",$€£ "}
+
+
+def convert_to_number(value, default=None):
+    """
+    Coerce a model-returned value to a float.
+
+    Accepts numbers as well as currency-formatted strings such as
+    "$1,234.56"; anything unparsable becomes the default.
+
+    Args:
+        value: Raw value from the model response
+        default: Returned when the value cannot be converted
+
+    Returns:
+        float, or the default
+    """
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
     try:
-        response = client.chat.completions.create(
-            model="gpt-4.1",  # Using vision-capable model
-            messages=[
+        return float(str(value).translate(_NUMERIC_CLEAN_TABLE))
+    except ValueError:
+        return default
+
+
+def _postprocess_items(items: list[dict], page_number: int, pdf_name: str) -> list[dict]:
+    """
+    Normalize extracted items and stamp page/PDF metadata.
+
+    The strict response schema guarantees the keys and types, so items
+    are read directly; numeric coercion stays as a cheap safety net.
+
+    Args:
+        items: Raw items parsed from the model response
+        page_number: Page number in the PDF
+        pdf_name: Name of the PDF file
+
+    Returns:
+        List of normalized item dicts
+    """
+    # Local binding keeps the per-item loop free of global lookups
+    convert = convert_to_number
+
+    return [
+        {
+            "line_number": item.get("line_number"),
+            "description": item.get("description", ""),
+            "amount": convert(item.get("amount"), 0.0),
+            "Quantity": convert(item.get("Quantity")),
+            "Unit_price": convert(item.get("Unit_price")),
+            "_page": page_number,
+            "_pdf": pdf_name
+        }
+        for item in items
+    ]
+
+
+def _build_text_messages(page_text: str) -> list[dict]:
+    """Build the chat messages for text-based extraction."""
+    return [
+        {
+            "role": "system",
+            "content": TEXT_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": page_text
+        }
+    ]
+
+
+def _build_batch_text_messages(batch: list[dict]) -> list[dict]:
+    """Build the chat messages for a multi-page batched text extraction."""
+    parts = [
+        f"<<<PAGE {page_data['page_number']}>>>\n{page_data['text']}"
+        for page_data in batch
+    ]
+    return [
+        {
+            "role": "system",
+            "content": TEXT_BATCH_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": "\n\n".join(parts)
+        }
+    ]
+
+
+def _build_image_messages(base64_image: str, detail: str = "high") -> list[dict]:
+    """Build the chat messages for vision-based extraction."""
+    mime = "png" if _render_settings()["format"] == "png" else "jpeg"
+    return [
+        {
+            "role": "system",
+            "content": IMAGE_SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": [
                 {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{base64_image}",
-                                "detail": "high"
-                            }
-                        }
-                    ]
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/{mime};base64,{base64_image}",
+                        "detail": detail
+                    }
                 }
-            ],
-            temperature=0,
-            max_tokens=4096,
-            response_format={"type": "json_object"}
-        )
-        
+            ]
+        }
+    ]
+
+
+class LineItem(BaseModel):
+    """
+    Expected shape of one extracted line item.
+
+    Strict structured outputs guarantee these types server-side, so the
+    model mirrors the response schema exactly; a mismatch means the
+    schema and the validation drifted apart and should fail loudly.
+    """
+    line_number: int
+    description: str
+    amount: float
+    Quantity: float | None
+    Unit_price: float | None
+
+
+class InvoiceItemsResponse(BaseModel):
+    """Expected top-level shape of an extraction response."""
+    items: list[LineItem]
+
+
+# How often a failing model output is re-prompted before giving up
+MAX_VALIDATION_ATTEMPTS = 3
+
+
+def _validate_items_response(response_text: str) -> list[dict]:
+    """
+    Parse a model response and check it against the items schema.
+
+    Returns the raw item dicts; alias resolution and numeric coercion
+    still happen in _postprocess_items.
+
+    Raises:
+        json.JSONDecodeError: When the response isn't valid JSON
+        ValidationError: When the JSON doesn't match the schema
+    """
+    parsed = _json_loads(response_text)
+    InvoiceItemsResponse.model_validate(parsed)
+    return parsed.get("items", [])
+
+
+def _feedback_messages(messages: list[dict], response_text: str, error) -> list[dict]:
+    """Extend a conversation with the bad output and its validation error."""
+    return messages + [
+        {"role": "assistant", "content": response_text},
+        {
+            "role": "user",
+            "content": f"Your previous output had this error: {error}. Return only valid JSON matching the schema."
+        }
+    ]
+
+
+async def _chat_items_async(
+    client: AsyncOpenAI,
+    model: str,
+    messages: list[dict],
+    max_tokens: int | None = None,
+    response_format: dict = ITEMS_RESPONSE_FORMAT
+) -> list[dict]:
+    """
+    Issue a chat completion and return schema-validated raw items.
+
+    Invalid output is fed back to the model with the validation error
+    and retried with backoff instead of silently dropping the page;
+    truncated output retries once with the large token budget.
+
+    Args:
+        client: AsyncOpenAI client instance
+        model: Name of the model to use
+        messages: Chat messages for the request
+        max_tokens: Initial output budget (None leaves it unset)
+        response_format: Structured-output schema for the request
+
+    Returns:
+        List of raw item dicts
+
+    Raises:
+        The last validation error if every attempt fails
+    """
+    for attempt in range(MAX_VALIDATION_ATTEMPTS):
+        kwargs = {
+            "model": model,
+            "messages": messages,
+            "temperature": 0,
+            "stream": False,
+            "response_format": response_format
+        }
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+
+        # Pace every call (retries included) through the shared bucket
+        limiter = _get_rate_limiter()
+        if limiter is not None:
+            await limiter.acquire(_estimate_tokens(messages, max_tokens))
+        response = await client.chat.completions.create(**kwargs)
+
+        # Truncated output: retry this call alone with the big budget
+        if max_tokens is not None and response.choices[0].finish_reason == "length":
+            kwargs["max_tokens"] = VISION_MAX_TOKENS_RETRY
+            if limiter is not None:
+                await limiter.acquire(_estimate_tokens(messages, VISION_MAX_TOKENS_RETRY))
+            response = await client.chat.completions.create(**kwargs)
+
         response_text = response.choices[0].message.content.strip()
-        parsed = json.loads(response_text)
-        
-        # Extract items from response
-        items = parsed.get("items", [])
-        
-        # Add page and PDF metadata to each item
-        for item in items:
-            item["_page"] = page_number
-            item["_pdf"] = pdf_name
-            
-            # Ensure amount is a float
-            if "amount" in item:
-                try:
-                    item["amount"] = float(item["amount"])
-                except (ValueError, TypeError):
-                    item["amount"] = 0.0
-            
-            # Ensure Quantity is a float or None
-            if "Quantity" in item and item["Quantity"] is not None:
-                try:
-                    item["Quantity"] = float(item["Quantity"])
-                except (ValueError, TypeError):
-                    item["Quantity"] = None
-            
-            # Ensure Unit_price is a float or None
-            if "Unit_price" in item and item["Unit_price"] is not None:
-                try:
-                    item["Unit_price"] = float(item["Unit_price"])
-                except (ValueError, TypeError):
-                    item["Unit_price"] = None
-        
-        return items
-        
-    except json.JSONDecodeError as e:
+        try:
+            return _validate_items_response(response_text)
+        except (json.JSONDecodeError, ValidationError) as e:
+            if attempt == MAX_VALIDATION_ATTEMPTS - 1:
+                raise
+            print(f"Invalid model output, re-prompting with feedback: {e}", file=sys.stderr)
+            messages = _feedback_messages(messages, response_text, e)
+            await asyncio.sleep(1.0 * (attempt + 1))
+
+
+async def extract_amounts_from_text(
+    client: AsyncOpenAI,
+    model_name: str,
+    page_text: str,
+    page_number: int,
+    pdf_name: str
+) -> list[dict]:
+    """
+    Use OpenAI to extract line item amounts from invoice text.
+
+    Args:
+        client: AsyncOpenAI client instance
+        model_name: Name of the model to use
+        page_text: Extracted text from the PDF page
+        page_number: Page number in the PDF
+        pdf_name: Name of the PDF file
+
+    Returns:
+        List of extracted line items with amounts
+    """
+    try:
+        items = await _chat_items_async(client, model_name, _build_text_messages(page_text))
+        return _postprocess_items(items, page_number, pdf_name)
+
+    except (json.JSONDecodeError, ValidationError) as e:
+        print(f"Error parsing JSON response: {e}", file=sys.stderr)
+        return []
+    except Exception as e:
+        print(f"Error during text extraction: {e}", file=sys.stderr)
+        return []
+
+
+async def extract_amounts_from_image(
+    client: AsyncOpenAI,
+    base64_image: str,
+    page_number: int,
+    pdf_name: str,
+    detail: str = "high"
+) -> list[dict]:
+    """
+    Use OpenAI Vision to extract line item amounts from an invoice image.
+
+    Args:
+        client: AsyncOpenAI client instance
+        base64_image: Base64-encoded image of the invoice page
+        page_number: Page number in the PDF
+        pdf_name: Name of the PDF file
+        detail: Vision detail level ("low" or "high")
+
+    Returns:
+        List of extracted line items with amounts
+    """
+    try:
+        items = await _chat_items_async(
+            client,
+            "gpt-4.1",  # Using vision-capable model
+            _build_image_messages(base64_image, detail),
+            max_tokens=_budget_settings()["vision_max_tokens"]
+        )
+        return _postprocess_items(items, page_number, pdf_name)
+
+    except (json.JSONDecodeError, ValidationError) as e:
         print(f"Error parsing JSON response: {e}", file=sys.stderr)
         return []
     except Exception as e:
@@ -320,15 +926,341 @@ IMPORTANT: Only extract what you can clearly see in the image. Do not guess or a
         return []
 
 
-def extract_invoice_amounts(pdf_path: str) -> dict:
+async def _process_page_async(
+    client: AsyncOpenAI,
+    model_name: str,
+    doc: fitz.Document,
+    pdf_name: str,
+    page_data: dict,
+    semaphore: asyncio.Semaphore
+) -> tuple[int, list[dict], str | None]:
+    """
+    Async counterpart of _process_page, bounded by a shared semaphore.
+
+    Args:
+        client: AsyncOpenAI client instance
+        model_name: Name of the model to use
+        doc: Open fitz document
+        pdf_name: Name of the PDF file
+        page_data: Page dict from iter_pdf_pages
+        semaphore: Semaphore capping in-flight API calls
+
+    Returns:
+        Tuple of (page_number, extracted items, error message or None)
+    """
+    page_num = page_data["page_number"]
+
+    async with semaphore:
+        try:
+            if page_data["has_text"]:
+                cache_key = _page_cache_key(page_data["text"].encode(), model_name)
+                cached = _page_cache_get(cache_key, page_num, pdf_name)
+                if cached is not None:
+                    print(f"Page {page_num}: Page cache hit", file=sys.stderr)
+                    return page_num, cached, None
+
+                print(f"Page {page_num}: Using text extraction", file=sys.stderr)
+                items = await _chat_items_async(
+                    client, model_name, _build_text_messages(page_data["text"]),
+                    max_tokens=_text_max_tokens(page_data["text"])
+                )
+                extraction_cache.put(cache_key, {"items": items})
+            else:
+                # Blank separator pages aren't worth an API call
+                if is_blank_page(doc, page_num):
+                    print(f"Page {page_num}: Blank page, skipping vision call", file=sys.stderr)
+                    return page_num, [], "blank"
+
+                # Start with the cheap render and escalate this page
+                # only when nothing is found
+                print(f"Page {page_num}: Using vision extraction (image-based PDF)", file=sys.stderr)
+                items = []
+                attempts = _vision_attempts()
+                for attempt_index, (dpi, detail) in enumerate(attempts):
+                    img_bytes = await _render_page_async(doc.name, page_num, dpi)
+                    cache_key = _page_cache_key(img_bytes, "gpt-4.1")
+                    cached = _page_cache_get(cache_key, page_num, pdf_name)
+                    if cached is not None:
+                        print(f"Page {page_num}: Page cache hit", file=sys.stderr)
+                        return page_num, cached, None
+
+                    base64_image = await _encode_image_async(img_bytes)
+                    items = await _chat_items_async(
+                        client,
+                        "gpt-4.1",  # Using vision-capable model
+                        _build_image_messages(base64_image, detail),
+                        max_tokens=_budget_settings()["vision_max_tokens"]
+                    )
+                    if items:
+                        extraction_cache.put(cache_key, {"items": items})
+                        break
+                    if attempt_index < len(attempts) - 1:
+                        next_dpi, next_detail = attempts[attempt_index + 1]
+                        print(f"Page {page_num}: No items at {dpi} DPI/{detail} detail, retrying at {next_dpi} DPI/{next_detail} detail", file=sys.stderr)
+
+            return page_num, _postprocess_items(items, page_num, pdf_name), None
+
+        except Exception as e:
+            return page_num, [], str(e)
+
+
+async def _process_text_batch_async(
+    client: AsyncOpenAI,
+    model_name: str,
+    pdf_name: str,
+    batch: list[dict],
+    semaphore: asyncio.Semaphore
+) -> list[tuple[int, list[dict], str | None]]:
+    """
+    Extract several short text pages with a single API call.
+
+    The model sees the pages separated by <<<PAGE n>>> delimiters and
+    stamps each returned item with its "_page"; items carrying an
+    unknown page land on the batch's first page rather than vanishing.
+
+    Args:
+        client: AsyncOpenAI client instance
+        model_name: Name of the model to use
+        pdf_name: Name of the PDF file
+        batch: Page dicts from iter_pdf_pages, all with text
+        semaphore: Semaphore capping in-flight API calls
+
+    Returns:
+        List of (page_number, items, error) tuples, one per page
+    """
+    page_nums = [page_data["page_number"] for page_data in batch]
+
+    async with semaphore:
+        try:
+            print(f"Pages {page_nums}: Using batched text extraction", file=sys.stderr)
+            items = await _chat_items_async(
+                client,
+                model_name,
+                _build_batch_text_messages(batch),
+                max_tokens=min(
+                    VISION_MAX_TOKENS_RETRY,
+                    sum(_text_max_tokens(page_data["text"]) for page_data in batch)
+                ),
+                response_format=BATCH_ITEMS_RESPONSE_FORMAT
+            )
+        except Exception as e:
+            return [(page_num, [], str(e)) for page_num in page_nums]
+
+    by_page: dict[int, list[dict]] = {page_num: [] for page_num in page_nums}
+    for item in items:
+        page = item.pop("_page", None)
+        target = page if page in by_page else page_nums[0]
+        by_page[target].append(item)
+
+    results = []
+    for page_data in batch:
+        page_num = page_data["page_number"]
+        raw = by_page[page_num]
+        # Feed the per-page cache so a later run of any one of these
+        # pages hits without re-batching
+        cache_key = _page_cache_key(page_data["text"].encode(), model_name)
+        extraction_cache.put(cache_key, {"items": raw})
+        results.append((page_num, _postprocess_items(raw, page_num, pdf_name), None))
+    return results
+
+
+async def _extract_pages_async(
+    model_name: str,
+    doc: fitz.Document,
+    pdf_name: str,
+    pages_data,
+    concurrency: int,
+    on_page_result=None
+) -> list[tuple[int, list[dict], str | None]]:
+    """
+    Dispatch all pages concurrently on one event loop.
+
+    A single event loop holds many in-flight HTTPS requests far more
+    cheaply than a thread per request; the semaphore caps concurrency
+    (and with it, how many rendered page images exist at once).
+
+    Args:
+        model_name: Name of the model to use
+        doc: Open fitz document
+        pdf_name: Name of the PDF file
+        pages_data: Iterable of page dicts from iter_pdf_pages
+        concurrency: Maximum number of in-flight API calls
+        on_page_result: Optional callback invoked with each
+            (page_number, items, error) tuple as soon as it completes,
+            in completion order
+
+    Returns:
+        List of (page_number, items, error) tuples sorted by page number
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    client = _get_async_client(concurrency)
+
+    # Template-heavy documents repeat pages verbatim (cover sheets,
+    # summary pages); only the first occurrence of each rendered page
+    # is sent to the API and duplicates reuse its items
+    seen_hashes: dict[str, int] = {}
+    duplicates: dict[int, int] = {}
+
+    tasks = []
+    text_batch: list[dict] = []
+    batch_chars = 0
+
+    def flush_text_batch():
+        nonlocal text_batch, batch_chars
+        if len(text_batch) == 1:
+            # A lone page gains nothing from the batch prompt
+            tasks.append(_process_page_async(
+                client, model_name, doc, pdf_name, text_batch[0], semaphore
+            ))
+        elif text_batch:
+            tasks.append(_process_text_batch_async(
+                client, model_name, pdf_name, text_batch, semaphore
+            ))
+        text_batch = []
+        batch_chars = 0
+
+    prefiltered: list[tuple[int, list[dict], str | None]] = []
+
+    for page_data in pages_data:
+        page_num = page_data["page_number"]
+        if page_data["has_text"]:
+            # A page whose text holds no monetary amount cannot yield
+            # line items; skip the model entirely
+            if _prefilter_enabled() and _AMOUNT_RE.search(page_data["text"]) is None:
+                print(f"Page {page_num}: No amounts in text, skipping LLM call", file=sys.stderr)
+                prefiltered.append((page_num, [], None))
+                continue
+
+            # Pack short pages together; each request carries fixed
+            # prompt and latency overhead
+            text_len = len(page_data["text"])
+            if text_len >= TEXT_BATCH_CHAR_BUDGET:
+                tasks.append(_process_page_async(
+                    client, model_name, doc, pdf_name, page_data, semaphore
+                ))
+                continue
+            if batch_chars + text_len > TEXT_BATCH_CHAR_BUDGET:
+                flush_text_batch()
+            text_batch.append(page_data)
+            batch_chars += text_len
+            continue
+
+        thumb_hash = _page_thumb_hash(doc, page_num)
+        original = seen_hashes.get(thumb_hash)
+        if original is not None:
+            duplicates[page_num] = original
+            continue
+        seen_hashes[thumb_hash] = page_num
+        tasks.append(
+            _process_page_async(client, model_name, doc, pdf_name, page_data, semaphore)
+        )
+    flush_text_batch()
+
+    # Consume tasks as they finish so results can stream out while
+    # later pages are still in flight; batch tasks return one tuple
+    # per page they covered
+    results = []
+    for page_result in prefiltered:
+        results.append(page_result)
+        if on_page_result is not None:
+            on_page_result(page_result)
+    for future in asyncio.as_completed(tasks):
+        task_result = await future
+        page_results = task_result if isinstance(task_result, list) else [task_result]
+        for page_result in page_results:
+            results.append(page_result)
+            if on_page_result is not None:
+                on_page_result(page_result)
+
+    if duplicates:
+        results_by_page = {page_num: result for page_num, *result in results}
+        for dup_page, original_page in duplicates.items():
+            print(f"Page {dup_page}: Identical to page {original_page}, reusing its items", file=sys.stderr)
+            items, error = results_by_page[original_page]
+            copied = [dict(item, _page=dup_page) for item in items]
+            results.append((dup_page, copied, error))
+            if on_page_result is not None:
+                on_page_result(results[-1])
+
+    return sorted(results, key=lambda r: r[0])
+
+
+def _page_cache_key(payload: bytes, model_name: str) -> str:
+    """
+    Content-addressable cache key for a single page's extraction.
+
+    Identical pages recur across documents in a corpus (shared cover
+    sheets, terms pages), so page-level entries hit even when the
+    whole-PDF cache misses.
+
+    Args:
+        payload: Page text bytes, or the rendered image bytes
+        model_name: Name of the model used for extraction
+
+    Returns:
+        Hex digest covering page content, model, and prompt version
+    """
+    hasher = hashlib.sha256()
+    hasher.update(len(payload).to_bytes(8, "little"))
+    hasher.update(payload)
+    hasher.update(f"page|{model_name}|{PROMPT_VERSION}".encode())
+    return hasher.hexdigest()
+
+
+def _page_cache_get(key: str, page_num: int, pdf_name: str) -> list[dict] | None:
+    """
+    Look up a cached page extraction and re-coerce it.
+
+    Running the cached rows back through _postprocess_items means an
+    entry written under an older item shape simply yields defaulted
+    fields rather than leaking stale structure into the output.
+
+    Args:
+        key: Page cache key from _page_cache_key
+        page_num: Page number to stamp on the items
+        pdf_name: PDF name to stamp on the items
+
+    Returns:
+        Postprocessed items on hit, or None on miss
+    """
+    entry = extraction_cache.get(key)
+    if entry is None or "items" not in entry:
+        return None
+    return _postprocess_items(entry["items"], page_num, pdf_name)
+
+
+def _cache_key(pdf_bytes: bytes, model_name: str) -> str:
+    """
+    Content-addressable cache key for a whole-PDF extraction.
+
+    Args:
+        pdf_bytes: Raw bytes of the PDF file
+        model_name: Name of the model used for extraction
+
+    Returns:
+        Hex digest covering document bytes, model, and prompt version
+    """
+    hasher = hashlib.sha256()
+    # Length prefix avoids ambiguity between concatenated parts
+    hasher.update(len(pdf_bytes).to_bytes(8, "little"))
+    hasher.update(pdf_bytes)
+    hasher.update(f"openai|{model_name}|{PROMPT_VERSION}".encode())
+    return hasher.hexdigest()
+
+
+def extract_invoice_amounts(pdf_path: str, max_workers: int | None = None) -> dict:
     """
     Main function to extract all amounts from an invoice PDF.
-    
+
     Automatically handles both text-based and image-based (scanned) PDFs.
-    
+    Pages are processed concurrently since each page is an independent
+    network-bound API call.
+
     Args:
         pdf_path: Path to the invoice PDF file
-        
+        max_workers: Maximum concurrent API calls (defaults to the
+            VISION_CONCURRENCY env var, or 10)
+
     Returns:
         Dictionary with extraction results in the required format
     """
@@ -342,60 +1274,82 @@ def extract_invoice_amounts(pdf_path: str) -> dict:
         "num_pages": 0,
         "total_items": 0,
         "amounts": [],
-        "failed_pages": []
+        "failed_pages": [],
+        "blank_pages": []
     }
     
     try:
         # Load configuration
         config = load_config()
         model_name = config.get("model", {}).get("name", "gpt-4.1-mini")
-        
-        # Load API key and initialize client
-        api_key = load_api_key()
-        client = OpenAI(api_key=api_key)
-        
-        # Extract text from PDF
-        pages_data = extract_text_from_pdf(pdf_path)
-        result["num_pages"] = len(pages_data)
-        
-        # Process each page
+
+        if max_workers is None:
+            env_workers = os.getenv("VISION_CONCURRENCY")
+            if env_workers:
+                max_workers = int(env_workers)
+            else:
+                limits = config.get("limits", {})
+                max_workers = int(limits.get("max_concurrency", 10))
+
+        # Serve a previous run of the identical document without any
+        # API calls at all
+        pdf_bytes = Path(pdf_path).read_bytes()
+        cache_key = _cache_key(pdf_bytes, model_name)
+        cached = extraction_cache.get(cache_key)
+        if cached is not None:
+            print(f"Cache hit for {pdf_name}, skipping extraction", file=sys.stderr)
+            cached["pdf_name"] = pdf_name
+            return cached
+
+        # Items stream to a JSONL sidecar as each page completes, so
+        # partial results survive a crash and the final write isn't a
+        # single large blocking dump
+        output_dir = Path(__file__).parent / "output"
+        output_dir.mkdir(exist_ok=True)
+        items_file = output_dir / f"{pdf_name}_items.jsonl"
+
+        def _stream_page_items(page_result):
+            page_num, items, error = page_result
+            for item in items:
+                items_stream.write(json.dumps(item) + "\n")
+
+        # One open handle serves the page count, text extraction, and
+        # any image rendering; fitz re-parses the xref on every open
+        with fitz.open(pdf_path) as doc, open(items_file, "w") as items_stream:
+            result["num_pages"] = doc.page_count
+
+            # Stream pages into the dispatcher instead of materializing
+            # the whole document up front; results come back sorted by
+            # page number so output order is stable. The persistent
+            # loop keeps the shared client's connections warm between
+            # documents.
+            page_results = _get_event_loop().run_until_complete(
+                _extract_pages_async(
+                    model_name, doc, pdf_name,
+                    iter_pdf_pages(doc), max_workers,
+                    on_page_result=_stream_page_items
+                )
+            )
+
         all_items = []
-        for page_data in pages_data:
-            page_num = page_data["page_number"]
-            
-            try:
-                if page_data["has_text"]:
-                    # Use text-based extraction
-                    print(f"Page {page_num}: Using text extraction", file=sys.stderr)
-                    items = extract_amounts_from_text(
-                        client=client,
-                        model_name=model_name,
-                        page_text=page_data["text"],
-                        page_number=page_num,
-                        pdf_name=pdf_name
-                    )
-                else:
-                    # Use vision-based extraction for image PDFs
-                    print(f"Page {page_num}: Using vision extraction (image-based PDF)", file=sys.stderr)
-                    base64_image = convert_page_to_image(pdf_path, page_num)
-                    items = extract_amounts_from_image(
-                        client=client,
-                        base64_image=base64_image,
-                        page_number=page_num,
-                        pdf_name=pdf_name
-                    )
-                
-                all_items.extend(items)
-                
-            except Exception as e:
+        for page_num, items, error in page_results:
+            if error == "blank":
+                result["blank_pages"].append(page_num)
+            elif error is not None:
                 result["failed_pages"].append({
                     "page": page_num,
-                    "reason": str(e)
+                    "reason": error
                 })
-        
+            else:
+                all_items.extend(items)
+
         # Update result with extracted items
         result["amounts"] = all_items
         result["total_items"] = len(all_items)
+
+        # Only fully successful extractions are worth remembering
+        if not result["failed_pages"]:
+            extraction_cache.put(cache_key, result)
         
     except FileNotFoundError:
         result["status"] = "error"
@@ -407,35 +1361,202 @@ def extract_invoice_amounts(pdf_path: str) -> dict:
     return result
 
 
-def main():
-    """Main entry point for command-line usage."""
-    if len(sys.argv) < 2:
-        print("Usage: python total_price_extraction.py <pdf_path>")
-        print("Example: python total_price_extraction.py data/invoice.pdf")
-        sys.exit(1)
-    
-    pdf_path = sys.argv[1]
-    
-    # Check if file exists
-    if not os.path.exists(pdf_path):
-        print(f"Error: File not found: {pdf_path}", file=sys.stderr)
-        sys.exit(1)
-    
-    # Extract amounts
-    result = extract_invoice_amounts(pdf_path)
-    
-    # Output as formatted JSON
-    print(json.dumps(result, indent=2))
-    
-    # Save to output file
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title} - Extracted Amounts</title>
+<style>
+body {{ font-family: Arial, sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; width: 100%; }}
+th, td {{ border: 1px solid #ccc; padding: 6px 10px; text-align: left; }}
+th {{ background: #f0f0f0; }}
+td.num {{ text-align: right; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>Pages: {num_pages} | Line items: {total_items}</p>
+<table>
+<tr><th>Line</th><th>Description</th><th>Quantity</th><th>Unit Price</th><th>Amount (USD)</th><th>Page</th></tr>
+"""
+
+HTML_ROW = (
+    '<tr><td>{line_number}</td><td>{description}</td>'
+    '<td class="num">{quantity}</td><td class="num">{unit_price}</td>'
+    '<td class="num">{amount}</td><td>{page}</td></tr>\n'
+)
+
+HTML_FOOT = """</table>
+</body>
+</html>
+"""
+
+# One-pass, C-level escaping; covers &, quotes, and angle brackets
+_HTML_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#39;"
+})
+
+
+def generate_html(result: dict, output_path: str) -> None:
+    """
+    Write an HTML table report for an extraction result.
+
+    Rows are formatted from a fixed template and written straight to
+    the file handle, so generation stays linear in item count instead
+    of repeatedly reallocating one growing string.
+
+    Args:
+        result: Extraction result dict from extract_invoice_amounts
+        output_path: Path of the HTML file to write
+    """
+    rows = [
+        HTML_ROW.format_map({
+            "line_number": item.get("line_number", ""),
+            "description": str(item.get("description", "")).translate(_HTML_ESCAPE_TABLE),
+            "quantity": "" if item.get("Quantity") is None else item.get("Quantity"),
+            "unit_price": "" if item.get("Unit_price") is None else item.get("Unit_price"),
+            "amount": item.get("amount", ""),
+            "page": item.get("_page", "")
+        })
+        for item in result.get("amounts", [])
+    ]
+
+    with open(output_path, "w") as f:
+        f.write(HTML_HEAD.format_map({
+            "title": str(result.get("pdf_name", "Invoice")).translate(_HTML_ESCAPE_TABLE),
+            "num_pages": result.get("num_pages", 0),
+            "total_items": result.get("total_items", 0)
+        }))
+        f.writelines(rows)
+        f.write(HTML_FOOT)
+
+
+# Two writer threads overlap output flushing with the next document's
+# network work; one pool per process (workers get their own copy)
+_io_pool = ThreadPoolExecutor(max_workers=2)
+
+
+def _log_write_error(future) -> None:
+    """Surface background write failures instead of dropping them."""
+    error = future.exception()
+    if error is not None:
+        print(f"Error writing output file: {error}", file=sys.stderr)
+
+
+def process_one_pdf(pdf_path: str, max_workers: int | None = None) -> dict:
+    """
+    Extract one PDF and save its JSON output file.
+
+    Top-level so it can run in a ProcessPoolExecutor worker; each
+    worker builds its own OpenAI client (clients are not fork-safe).
+
+    Args:
+        pdf_path: Path to the invoice PDF file
+        max_workers: Concurrent API calls for this PDF's pages
+
+    Returns:
+        The extraction result dict
+    """
+    result = extract_invoice_amounts(pdf_path, max_workers=max_workers)
+
     output_dir = Path(__file__).parent / "output"
     output_dir.mkdir(exist_ok=True)
-    
+
+    # Hand the writes to the IO pool so the caller can move on to the
+    # next document while this one's files flush
     output_file = output_dir / f"{Path(pdf_path).stem}_amounts.json"
-    with open(output_file, "w") as f:
-        json.dump(result, indent=2, fp=f)
-    
-    print(f"\nResults saved to: {output_file}", file=sys.stderr)
+    _io_pool.submit(save_json_output, result, output_file).add_done_callback(_log_write_error)
+
+    html_file = output_dir / f"{Path(pdf_path).stem}_amounts.html"
+    _io_pool.submit(generate_html, result, str(html_file)).add_done_callback(_log_write_error)
+
+    print(f"Results saved to: {output_file}", file=sys.stderr)
+    return result
+
+
+def main():
+    """Main entry point for command-line usage."""
+    parser = argparse.ArgumentParser(
+        description="Extract line item amounts from invoice PDFs."
+    )
+    parser.add_argument(
+        "path",
+        nargs="?",
+        default="data",
+        help="invoice PDF file or a directory of PDFs (default: data/)"
+    )
+    parser.add_argument(
+        "--parallel-pdfs",
+        type=int,
+        default=None,
+        help="number of PDFs processed at once (default: CPU count)"
+    )
+    parser.add_argument(
+        "--parallel-pages",
+        type=int,
+        default=None,
+        help="concurrent API calls per PDF (default: VISION_CONCURRENCY or 10)"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="directory for cached extraction results (default: cache/)"
+    )
+    args = parser.parse_args()
+
+    # Propagated through the environment so ProcessPoolExecutor workers
+    # see the same cache directory
+    if args.cache_dir:
+        os.environ["EXTRACTION_CACHE_DIR"] = args.cache_dir
+
+    target = Path(args.path)
+    if target.is_dir():
+        pdf_files = sorted(str(p) for p in target.glob("*.pdf"))
+        if not pdf_files:
+            print(f"Error: No PDF files found in: {target}", file=sys.stderr)
+            sys.exit(1)
+    elif target.exists():
+        pdf_files = [str(target)]
+    else:
+        print(f"Error: File not found: {target}", file=sys.stderr)
+        sys.exit(1)
+
+    if len(pdf_files) == 1:
+        result = process_one_pdf(pdf_files[0], args.parallel_pages)
+        print(json.dumps(result, indent=2))
+        _io_pool.shutdown(wait=True)
+        return
+
+    # Most of the per-PDF time is network wait, so running PDFs in
+    # parallel processes (each with its own page-level concurrency)
+    # keeps the upstream rate limit busy; rendering is CPU-isolated
+    # per worker as a bonus
+    num_workers = args.parallel_pdfs or os.cpu_count()
+    num_workers = min(num_workers, len(pdf_files))
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = {
+            executor.submit(process_one_pdf, pdf_path, args.parallel_pages): pdf_path
+            for pdf_path in pdf_files
+        }
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            try:
+                result = future.result()
+                print(
+                    f"{pdf_path}: {result['status']}, "
+                    f"{result['total_items']} items",
+                    file=sys.stderr
+                )
+            except Exception as e:
+                print(f"{pdf_path}: failed ({e})", file=sys.stderr)
+
+    _io_pool.shutdown(wait=True)
 
 
 if __name__ == "__main__":